@@ -1,14 +1,98 @@
+import time
 import streamlit as st
 from src.scraper import fetch_article
 from src.cleaner import clean_text
 from src.chunker import chunk_text
-from src.llm_client import summarize_article_with_gemini
 from src.cache_db import CacheDB
+from src.singleflight import SingleFlight, flight_key
+from src.revalidate import Revalidator
+from src.near_dup import NearDupIndex
+from src.profiles import ProfileRegistry
+from src.deadline import Deadline
 from dotenv import load_dotenv
 
 st.set_page_config(page_title="News Summarizer (Gemini)", layout="wide")
 
-cache = CacheDB("data/cache.db")
+
+# Streamlit re-executes this script on every interaction; keep the DB handle
+# and the Gemini client alive across reruns instead of rebuilding them.
+@st.cache_resource
+def get_cache():
+    return CacheDB("data/cache.db")
+
+
+@st.cache_resource
+def get_llm_client():
+    # imported here so cache hits never load the Gemini SDK
+    from src.llm_client import _init_client
+    return _init_client()
+
+
+@st.cache_resource
+def get_flight():
+    # shared by every session in this process so identical requests coalesce
+    return SingleFlight(get_cache())
+
+
+@st.cache_resource
+def get_revalidator():
+    return Revalidator(get_flight(), max_workers=2)
+
+
+@st.cache_resource
+def get_near_dup():
+    return NearDupIndex(get_cache())
+
+
+@st.cache_resource
+def get_profiles():
+    return ProfileRegistry(get_cache())
+
+
+cache = get_cache()
+
+
+def cached_since(url, since):
+    # a coalesced waiter must only pick up a summary written after it started
+    # waiting, not an older row for different content under the same URL
+    row = cache.get(url)
+    return row if row and row.get("ts", 0) >= since else None
+
+
+# The two pipeline steps below may run on Revalidator threads, so they take
+# every resource as an argument instead of calling the st.cache_resource getters.
+def summarize_and_store(url, article, cleaned, *, client, near_dup, model, max_chars, deadline, hedge):
+    from src.llm_client import summarize_article_with_gemini
+
+    chunks = chunk_text(cleaned, max_chars=max_chars)
+    summary_obj, meta_obj = summarize_article_with_gemini(chunks, model=model, client=client,
+                                                          deadline=deadline, hedge=hedge)
+    result = {"title": article.get("title",""), "summary": summary_obj, "meta": meta_obj}
+    if summary_obj.get("partial"):
+        # don't cache a summary cut short by the deadline
+        return result
+    # save same shapes to DB
+    cache.save(url, article.get("title",""), summary_obj, meta_obj, published=article.get("date"))
+    near_dup.add(url, cleaned)
+    return result
+
+
+def refresh_summary(url, *, profiles, time_budget, **kwargs):
+    # background stale-while-revalidate refresh: fetch happens here, off the request path
+    deadline = Deadline(time_budget)
+    article = fetch_article(url, profiles=profiles, deadline=deadline)
+    cleaned = clean_text(article.get("text",""))
+    return summarize_and_store(url, article, cleaned, deadline=deadline, **kwargs)
+
+
+def show_summary(summary_obj, meta_obj, label="Summary"):
+    st.markdown(f"**{label} (json)**")
+    st.json(summary_obj)
+    st.markdown(f"**{label} (text)**")
+    st.write(summary_obj.get("summary", ""))
+    st.markdown("**Meta (topic / sentiment)**")
+    st.write(meta_obj)
+
 
 st.title("News Summarizer — Gemini demo")
 st.markdown("Paste a public news article URL or choose a sample. Summaries use Google Gemini (set GEMINI_API_KEY).")
@@ -25,52 +109,90 @@ with col2:
     model = st.selectbox("Gemini model", ["gemini-2.5-flash", "gemini-1.0", "gemini-2.5-small"])
     max_chars = st.number_input("Chunk char limit", min_value=1000, max_value=8000, value=3000, step=500)
     use_cache = st.checkbox("Use cache (24h)", value=True)
+    time_budget = st.number_input("Time budget (s)", min_value=5, max_value=300, value=45, step=5)
+    hedge = st.checkbox("Hedge slow Gemini calls", value=False)
 
-if st.button("Fetch & Summarize"):
-    if not url:
-        st.error("Please paste an article URL.")
-    else:
-        with st.spinner("Fetching article..."):
+def handle_request(url):
+    # check cache first: hits (fresh or stale) are served without fetching the page
+    cached = cache.get(url, allow_stale=True) if use_cache else None
+    if cached:
+        st.subheader(cached.get("title") or "Untitled")
+        st.write(f"Source: {url}")
+        st.write(f"Published: {cached.get('published') or 'unknown'}")
+        if cached.get("stale"):
+            # serving stale content must not depend on the LLM being available:
+            # if the refresh can't be set up, skip it and still show the summary
             try:
-                article = fetch_article(url)
+                # resolve cached resources here, on the script thread
+                resources = dict(profiles=get_profiles(), client=get_llm_client(), near_dup=get_near_dup())
+                get_revalidator().schedule(
+                    flight_key(url),
+                    lambda: refresh_summary(url, time_budget=time_budget, model=model, max_chars=max_chars,
+                                            hedge=hedge, **resources),
+                    lookup=lambda since=int(time.time()): cached_since(url, since),
+                )
+                st.info("Using cached summary (older than 24h) — refreshing in the background.")
             except Exception as e:
-                st.error(f"Failed to fetch: {e}")
-                st.stop()
+                st.warning(f"Using cached summary (older than 24h) — background refresh unavailable: {e}")
+        else:
+            st.info("Using cached summary (within 24h).")
+        show_summary(cached.get("summary") or {}, cached.get("meta") or {})
+        return
 
-        st.subheader(article.get("title", "Untitled"))
-        st.write(f"Source: {article.get('url')}")
-        st.write(f"Published: {article.get('date', 'unknown')}")
+    # one budget for fetch + summarize; on expiry we get a partial summary
+    deadline = Deadline(time_budget)
+    with st.spinner("Fetching article..."):
+        try:
+            article = fetch_article(url, profiles=get_profiles(), deadline=deadline)
+        except Exception as e:
+            st.error(f"Failed to fetch: {e}")
+            return
 
-        cleaned = clean_text(article.get("text",""))
-        show_raw = st.checkbox("Show cleaned text", value=False)
-        if show_raw:
-            st.text_area("Cleaned article text", cleaned[:100000], height=400)
+    st.subheader(article.get("title", "Untitled"))
+    st.write(f"Source: {article.get('url')}")
+    st.write(f"Published: {article.get('date', 'unknown')}")
 
-        # check cache
-        cached = cache.get(url) if use_cache else None
-        if cached:
-            st.info("Using cached summary (within 24h).")
-            summary_obj = cached.get("summary") or {}
-            meta_obj = cached.get("meta") or {}
-            st.markdown("**Summary (json)**")
-            st.json(summary_obj)
-            st.markdown("**Summary (text)**")
-            st.write(summary_obj.get("summary", ""))
-            st.markdown("**Meta (topic / sentiment)**")
-            st.write(meta_obj)
-        else:
-            st.info("No cached summary — generating via Gemini...")
-            with st.spinner("Chunking and calling Gemini (may take a few seconds)..."):
-                chunks = chunk_text(cleaned, max_chars=max_chars)
-                summary_obj, meta_obj = summarize_article_with_gemini(chunks, model=model)
-                st.markdown("**3-sentence summary (json)**")
-                st.json(summary_obj)
-                st.markdown("**3-sentence summary (text)**")
-                st.write(summary_obj.get("summary", ""))
-                st.markdown("**Meta (topic / sentiment)**")
-                st.write(meta_obj)
-                # save same shapes to DB
-                cache.save(url, article.get("title",""), summary_obj, meta_obj)
+    cleaned = clean_text(article.get("text",""))
+    show_raw = st.checkbox("Show cleaned text", value=False)
+    if show_raw:
+        st.text_area("Cleaned article text", cleaned[:100000], height=400)
+
+    near_dup = get_near_dup()
+    if use_cache:
+        # wire copy / light rewrites of an article we already summarized
+        dup = near_dup.find(cleaned, exclude_url=url)
+        dup_cached = cache.get(dup[0]) if dup else None
+        if dup_cached:
+            st.info(f"Near-duplicate of {dup[0]} — reusing its summary.")
+            cache.save(url, article.get("title",""), dup_cached.get("summary"), dup_cached.get("meta"),
+                       published=article.get("date"))
+            near_dup.add(url, cleaned)
+            show_summary(dup_cached.get("summary") or {}, dup_cached.get("meta") or {})
+            return
+
+    st.info("No cached summary — generating via Gemini...")
+    with st.spinner("Chunking and calling Gemini (may take a few seconds)..."):
+        client = get_llm_client()
+        # concurrent requests for the same article share one Gemini run
+        result = get_flight().do(
+            flight_key(url, cleaned),
+            lambda: summarize_and_store(url, article, cleaned, client=client, near_dup=near_dup, model=model,
+                                        max_chars=max_chars, deadline=deadline, hedge=hedge),
+            lookup=lambda since=int(time.time()): cached_since(url, since),
+        )
+        summary_obj = result.get("summary") or {}
+        meta_obj = result.get("meta") or {}
+        if summary_obj.get("partial"):
+            st.warning(f"Time budget ran out — partial summary from "
+                       f"{summary_obj.get('chunks_summarized')} of {summary_obj.get('chunks_total')} chunks.")
+        show_summary(summary_obj, meta_obj, label="3-sentence summary")
+
+
+if st.button("Fetch & Summarize"):
+    if not url:
+        st.error("Please paste an article URL.")
+    else:
+        handle_request(url)
 
 st.markdown("---")
 st.write("Notes: respects robots.txt heuristics? This demo does not fully enforce robots.txt — do not scrape disallowed sites in production.")
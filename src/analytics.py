@@ -0,0 +1,204 @@
+# src/analytics.py
+"""
+Columnar export of the summary cache and vectorized trend reports.
+
+    python -m src.analytics export [cache.db] [out_dir]
+    python -m src.analytics report [out_dir] [plots_dir]
+
+`export` appends rows changed since the last run to a Parquet dataset
+partitioned by day (out_dir/day=YYYY-MM-DD/part-<ts>.parquet). Reports
+read that dataset with pandas, never the JSON meta column.
+"""
+import json
+import os
+import sqlite3
+import sys
+import uuid
+from typing import Optional
+
+DEFAULT_EXPORT_DIR = "data/summaries_parquet"
+WATERMARK_FILE = "_watermark.json"
+
+SENTIMENT_SCORES = {"negative": -1.0, "neutral": 0.0, "positive": 1.0}
+
+# ts is whole seconds, so the watermark is the last exported second plus the
+# urls already exported in it: rows saved later in that same second are
+# still picked up on the next run, and nothing is exported twice
+_EXPORT_QUERY = """
+SELECT url, title, topic, sentiment, domain, published, ts
+FROM summaries WHERE ts >= ? ORDER BY ts
+"""
+
+
+def _schema():
+    # explicit types so a part whose topic/sentiment are all None is not
+    # written as the null type (which then fails to merge with other parts)
+    import pyarrow as pa
+
+    return pa.schema([
+        ("url", pa.string()),
+        ("title", pa.string()),
+        ("topic", pa.string()),
+        ("sentiment", pa.string()),
+        ("domain", pa.string()),
+        ("published", pa.timestamp("us", tz="UTC")),
+        ("ts", pa.timestamp("us", tz="UTC")),
+    ])
+
+
+def _read_watermark(out_dir: str):
+    try:
+        with open(os.path.join(out_dir, WATERMARK_FILE)) as f:
+            mark = json.load(f)
+        return int(mark.get("ts", 0)), set(mark.get("urls", []))
+    except (OSError, ValueError):
+        return 0, set()
+
+
+def _write_watermark(out_dir: str, ts: int, urls):
+    tmp = os.path.join(out_dir, WATERMARK_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"ts": ts, "urls": sorted(urls)}, f)
+    os.replace(tmp, os.path.join(out_dir, WATERMARK_FILE))
+
+
+def export_parquet(cache_path: str, out_dir: str = DEFAULT_EXPORT_DIR, chunksize: int = 100_000) -> int:
+    """
+    Incrementally export summaries not yet covered by the stored watermark.
+    Reads the typed columns in chunks (memory stays bounded) and writes one
+    Parquet file per day per run. Returns the number of rows exported.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _schema()
+    os.makedirs(out_dir, exist_ok=True)
+    mark_ts, mark_urls = _read_watermark(out_dir)
+    run_id = uuid.uuid4().hex[:8]
+    conn = sqlite3.connect(cache_path, check_same_thread=False)
+    total = 0
+    try:
+        for df in pd.read_sql_query(_EXPORT_QUERY, conn, params=(mark_ts,), chunksize=chunksize):
+            df = df[~((df["ts"] == mark_ts) & df["url"].isin(mark_urls))]
+            if df.empty:
+                continue
+            last = int(df["ts"].iloc[-1])
+            last_urls = set(df.loc[df["ts"] == last, "url"])
+            if last == mark_ts:
+                mark_urls |= last_urls
+            else:
+                mark_ts, mark_urls = last, last_urls
+            df["ts"] = pd.to_datetime(df["ts"], unit="s", utc=True)
+            df["published"] = pd.to_datetime(df["published"], utc=True, errors="coerce", format="mixed")
+            for day, part in df.groupby(df["ts"].dt.strftime("%Y-%m-%d"), sort=False):
+                part_dir = os.path.join(out_dir, f"day={day}")
+                os.makedirs(part_dir, exist_ok=True)
+                table = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+                pq.write_table(table, os.path.join(part_dir, f"part-{last}-{run_id}-{total}.parquet"))
+            total += len(df)
+    finally:
+        conn.close()
+    if total:
+        _write_watermark(out_dir, mark_ts, mark_urls)
+    return total
+
+
+def load_summaries(out_dir: str = DEFAULT_EXPORT_DIR, columns: Optional[list] = None):
+    """
+    Load the exported dataset. Rows re-exported after a refresh are
+    de-duplicated by url (latest ts wins). Adds a `date` column: the
+    published time when known, else the cache timestamp.
+    """
+    import pandas as pd
+
+    df = pd.read_parquet(out_dir, columns=columns)
+    if df.empty:
+        return df
+    df = df.sort_values("ts").drop_duplicates("url", keep="last")
+    for col in ("topic", "sentiment", "domain"):
+        if col in df:
+            df[col] = df[col].astype("category")
+    df["date"] = df["published"].fillna(df["ts"]) if "published" in df else df["ts"]
+    return df
+
+
+def topic_volume(df, freq: str = "D", top_n: int = 10):
+    """Articles per period per topic (top_n topics by total volume)."""
+    tagged = df.dropna(subset=["topic"])
+    counts = (tagged.groupby([tagged["date"].dt.floor(freq), "topic"], observed=True)
+                .size()
+                .unstack(fill_value=0))
+    top = counts.sum().nlargest(top_n).index
+    return counts[top]
+
+
+def sentiment_trend(df, freq: str = "D"):
+    """
+    Per period: mean sentiment score (-1 negative .. +1 positive) and the
+    article count for each sentiment label.
+    """
+    scored = df.assign(score=df["sentiment"].astype(str).map(SENTIMENT_SCORES))
+    period = scored["date"].dt.floor(freq)
+    out = scored.groupby(period)["score"].mean().to_frame("mean_score")
+    labelled = scored.dropna(subset=["sentiment"])
+    labels = (labelled.groupby([labelled["date"].dt.floor(freq), "sentiment"], observed=True)
+                      .size()
+                      .unstack(fill_value=0))
+    return out.join(labels).fillna({c: 0 for c in labels.columns})
+
+
+def plot_topic_volume(df, freq: str = "D", top_n: int = 8):
+    # Figure (not pyplot) so plots are safe to build from Streamlit threads
+    from matplotlib.figure import Figure
+
+    vol = topic_volume(df, freq=freq, top_n=top_n)
+    fig = Figure(figsize=(10, 4))
+    ax = fig.add_subplot()
+    if not vol.empty:
+        vol.plot.area(ax=ax, stacked=True, linewidth=0)
+    ax.set_title("Topic volume")
+    ax.set_ylabel("articles")
+    fig.tight_layout()
+    return fig
+
+
+def plot_sentiment_trend(df, freq: str = "D"):
+    from matplotlib.figure import Figure
+
+    trend = sentiment_trend(df, freq=freq)
+    fig = Figure(figsize=(10, 4))
+    ax = fig.add_subplot()
+    if not trend.empty:
+        trend["mean_score"].plot(ax=ax, marker="o")
+    ax.axhline(0, color="grey", linewidth=0.5)
+    ax.set_ylim(-1.05, 1.05)
+    ax.set_title("Mean sentiment")
+    ax.set_ylabel("negative .. positive")
+    fig.tight_layout()
+    return fig
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("export", "report"):
+        print(__doc__)
+        return 2
+    if argv[0] == "export":
+        cache_path = argv[1] if len(argv) > 1 else os.environ.get("CACHE_DB_PATH", "data/cache.db")
+        out_dir = argv[2] if len(argv) > 2 else DEFAULT_EXPORT_DIR
+        n = export_parquet(cache_path, out_dir)
+        print(f"exported {n} rows to {out_dir}")
+        return 0
+    out_dir = argv[1] if len(argv) > 1 else DEFAULT_EXPORT_DIR
+    plots_dir = argv[2] if len(argv) > 2 else "data/reports"
+    os.makedirs(plots_dir, exist_ok=True)
+    df = load_summaries(out_dir)
+    plot_topic_volume(df).savefig(os.path.join(plots_dir, "topic_volume.png"))
+    plot_sentiment_trend(df).savefig(os.path.join(plots_dir, "sentiment_trend.png"))
+    print(f"wrote reports to {plots_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,71 @@ import time
 import tempfile
 import warnings
 from typing import Optional, Any
+from urllib.parse import urlparse
+
+# typed copies of the meta fields so analytics can filter/group in SQL
+# instead of json.loads-ing every row (see src/analytics.py)
+TYPED_COLUMNS = {
+    "topic": "TEXT",
+    "sentiment": "TEXT",
+    "domain": "TEXT",
+    "published": "TEXT",
+}
+
+def _as_label(value: Any) -> Optional[str]:
+    # Gemini's JSON is not guaranteed to use strings (lists, numbers, ...)
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        value = ", ".join(str(v) for v in value)
+    return str(value).strip().lower() or None
+
+def _typed_fields(url: str, meta: Any, published: Optional[str]):
+    """(topic, sentiment, domain, published) for the typed summary columns."""
+    meta = meta if isinstance(meta, dict) else {}
+    topic = _as_label(meta.get("topic"))
+    sentiment = _as_label(meta.get("sentiment"))
+    domain = urlparse(url).netloc.lower()
+    if domain.startswith("www."):
+        domain = domain[4:]
+    return topic, sentiment, domain or None, published
+
+def _columns(c, table: str) -> set:
+    c.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in c.fetchall()}
+
+def _ensure_columns(conn, table: str, columns: dict, on_added=None) -> list:
+    """
+    Add any of `columns` ({name: type}) missing from `table`. Safe when
+    several processes open the same file at once: the check is repeated
+    under BEGIN IMMEDIATE, and a column added by someone else in between
+    ("duplicate column name") counts as done. on_added(cursor) runs in the
+    same transaction when this call added anything (e.g. a backfill).
+    Returns the columns this call added.
+    """
+    c = conn.cursor()
+    if not [col for col in columns if col not in _columns(c, table)]:
+        return []
+    added = []
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        existing = _columns(c, table)
+        for col, col_type in columns.items():
+            if col in existing:
+                continue
+            try:
+                c.execute(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}")
+                added.append(col)
+            except sqlite3.OperationalError as e:
+                if "duplicate column name" not in str(e):
+                    raise
+        if added and on_added is not None:
+            on_added(c)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return added
 
 class CacheDB:
     def __init__(self, path: Optional[str] = None):
@@ -40,22 +105,93 @@ class CacheDB:
             title TEXT,
             summary TEXT,
             meta TEXT,
+            ts INTEGER,
+            topic TEXT,
+            sentiment TEXT,
+            domain TEXT,
+            published TEXT
+        );
+        """)
+        self._migrate_typed_columns(conn)
+        c = conn.cursor()
+        # short-lived ownership rows used to coalesce identical requests
+        # across worker processes (see src/singleflight.py)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS leases (
+            key TEXT PRIMARY KEY,
+            owner TEXT,
+            expires INTEGER
+        );
+        """)
+        # 64-bit SimHash of each article's cleaned text, split into four
+        # indexed 16-bit bands for near-duplicate lookup (see src/near_dup.py)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS simhashes (
+            url TEXT PRIMARY KEY,
+            hash INTEGER,
+            b0 INTEGER, b1 INTEGER, b2 INTEGER, b3 INTEGER,
+            shingles INTEGER
+        );
+        """)
+        # files indexed before shingle counts were stored
+        _ensure_columns(conn, "simhashes", {"shingles": "INTEGER"})
+        for i in range(4):
+            c.execute(f"CREATE INDEX IF NOT EXISTS idx_simhashes_b{i} ON simhashes (b{i})")
+        # per-domain CSS selectors learned by src/profiles.py; votes holds
+        # the selector tallies while a domain is still being learned
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS extraction_profiles (
+            domain TEXT PRIMARY KEY,
+            body TEXT,
+            title TEXT,
+            date TEXT,
+            samples INTEGER,
+            votes TEXT,
             ts INTEGER
         );
         """)
         conn.commit()
         conn.close()
 
-    def get(self, url: str, max_age_seconds: int = 86400) -> Optional[dict]:
+    @staticmethod
+    def _migrate_typed_columns(conn):
+        # older cache files only have the JSON meta column: add the typed
+        # columns and backfill them once from the existing rows
+        def backfill(c):
+            c.execute("SELECT url, meta FROM summaries")
+            updates = []
+            for url, meta_json in c.fetchall():
+                try:
+                    meta = json.loads(meta_json)
+                except Exception:
+                    meta = {}
+                updates.append(_typed_fields(url, meta, None) + (url,))
+            c.executemany("""
+            UPDATE summaries SET topic = ?, sentiment = ?, domain = ?, published = ?
+            WHERE url = ?
+            """, updates)
+
+        _ensure_columns(conn, "summaries", TYPED_COLUMNS, on_added=backfill)
+        c = conn.cursor()
+        for col in ("ts", *TYPED_COLUMNS):
+            c.execute(f"CREATE INDEX IF NOT EXISTS idx_summaries_{col} ON summaries ({col})")
+
+    def get(self, url: str, max_age_seconds: int = 86400, allow_stale: bool = False) -> Optional[dict]:
+        """
+        Returns {title, summary, meta, stale, ts, published} or None.
+        With allow_stale=True an expired row is still returned, flagged stale=True,
+        so the caller can serve it while a refresh runs in the background.
+        """
         conn = sqlite3.connect(self.path, check_same_thread=False)
         c = conn.cursor()
-        c.execute("SELECT title, summary, meta, ts FROM summaries WHERE url = ?", (url,))
+        c.execute("SELECT title, summary, meta, ts, published FROM summaries WHERE url = ?", (url,))
         r = c.fetchone()
         conn.close()
         if not r:
             return None
-        title, summary_json, meta_json, ts = r
-        if int(time.time()) - ts > max_age_seconds:
+        title, summary_json, meta_json, ts, published = r
+        stale = int(time.time()) - ts > max_age_seconds
+        if stale and not allow_stale:
             return None
         try:
             summary_obj = json.loads(summary_json)
@@ -65,17 +201,64 @@ class CacheDB:
             meta_obj = json.loads(meta_json)
         except Exception:
             meta_obj = meta_json
-        return {"title": title, "summary": summary_obj, "meta": meta_obj}
+        return {"title": title, "summary": summary_obj, "meta": meta_obj, "stale": stale, "ts": ts,
+                "published": published}
 
-    def save(self, url: str, title: str, summary: Any, meta: Any):
+    def save(self, url: str, title: str, summary: Any, meta: Any, published: Optional[str] = None):
         conn = sqlite3.connect(self.path, check_same_thread=False)
         c = conn.cursor()
         c.execute("""
-        INSERT OR REPLACE INTO summaries (url, title, summary, meta, ts)
-        VALUES (?, ?, ?, ?, ?)
+        INSERT OR REPLACE INTO summaries (url, title, summary, meta, ts, topic, sentiment, domain, published)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (url, title,
               json.dumps(summary, ensure_ascii=False),
               json.dumps(meta, ensure_ascii=False),
-              int(time.time())))
+              int(time.time()),
+              *_typed_fields(url, meta, published)))
+        conn.commit()
+        conn.close()
+
+    def acquire_lease(self, key: str, owner: str, ttl_seconds: int = 300) -> bool:
+        """
+        Try to take the lease for `key`. Expired leases are reclaimed.
+        Returns True if `owner` now holds it.
+        """
+        now = int(time.time())
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            c.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, now))
+            c.execute("INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                      (key, owner, now + ttl_seconds))
+            acquired = c.rowcount == 1
+            conn.commit()
+        finally:
+            conn.close()
+        return acquired
+
+    def renew_lease(self, key: str, owner: str, ttl_seconds: int = 300) -> bool:
+        """Push back the expiry of a lease `owner` still holds. Returns False if it was lost."""
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        c = conn.cursor()
+        c.execute("UPDATE leases SET expires = ? WHERE key = ? AND owner = ?",
+                  (int(time.time()) + ttl_seconds, key, owner))
+        renewed = c.rowcount == 1
+        conn.commit()
+        conn.close()
+        return renewed
+
+    def lease_held(self, key: str) -> bool:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        c = conn.cursor()
+        c.execute("SELECT 1 FROM leases WHERE key = ? AND expires >= ?", (key, int(time.time())))
+        r = c.fetchone()
+        conn.close()
+        return r is not None
+
+    def release_lease(self, key: str, owner: str):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        c = conn.cursor()
+        c.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
         conn.commit()
         conn.close()
@@ -1,5 +1,4 @@
 import re
-from bs4 import BeautifulSoup
 
 def clean_text(raw_text_or_html: str) -> str:
     """
@@ -7,6 +6,7 @@ def clean_text(raw_text_or_html: str) -> str:
     """
     # If it looks like HTML, strip tags
     if "<html" in raw_text_or_html.lower() or "<body" in raw_text_or_html.lower():
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(raw_text_or_html, "html.parser")
         # remove script/style
         for s in soup(["script","style","noscript"]):
@@ -0,0 +1,70 @@
+# src/deadline.py
+import threading
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(RuntimeError):
+    pass
+
+
+class Deadline:
+    """
+    Request-scoped time budget, passed down through fetch_article,
+    summarize_article_with_gemini and _call_gemini so every timeout,
+    retry and backoff sleep is bounded by the time actually left.
+    """
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def shortened(self, seconds: float) -> "Deadline":
+        """A child deadline ending `seconds` earlier, e.g. to keep time back for a final step."""
+        child = Deadline.__new__(Deadline)
+        child.budget = max(0.0, self.budget - seconds)
+        child.expires_at = self.expires_at - seconds
+        return child
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """The smaller of `cap` and the remaining time; raises if none is left."""
+        left = self.remaining()
+        if left <= 0:
+            raise DeadlineExceeded(f"deadline of {self.budget:.1f}s exceeded")
+        return left if cap is None else min(cap, left)
+
+    def sleep(self, seconds: float):
+        """Sleep for `seconds`, or raise instead if the deadline would pass first."""
+        if seconds >= self.remaining():
+            raise DeadlineExceeded(f"deadline of {self.budget:.1f}s exceeded")
+        time.sleep(seconds)
+
+
+class LatencyTracker:
+    """Rolling window of call latencies, used to pick the hedge delay."""
+
+    def __init__(self, window: int = 200, min_samples: int = 10):
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples = []
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            if len(self._samples) > self.window:
+                del self._samples[0]
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q in [0, 1]; None until min_samples have been recorded."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
@@ -0,0 +1,137 @@
+# src/extract_pool.py
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from src.scraper import fetch_html, extract_article, _build_session
+from src.cleaner import clean_text
+
+# per-process ProfileRegistry, set up by _init_worker when a cache path is given
+_profiles = None
+
+
+def _init_worker(cache_path: Optional[str]):
+    # the parent has already set up the schema (see ExtractionPool); workers
+    # only attach to it, and raise here (breaking the pool) if they can't
+    global _profiles
+    if cache_path:
+        from src.profiles import ProfileRegistry
+        _profiles = ProfileRegistry.for_path(cache_path)
+
+
+def _extract_worker(item: Tuple[str, bytes]) -> dict:
+    """
+    Runs in a worker process: parse raw HTML and clean the text.
+    Errors are returned in the dict rather than raised so one bad page
+    does not abort a whole chunk of results.
+    """
+    url, raw = item
+    try:
+        article = extract_article(raw, url, profiles=_profiles)
+        article["cleaned"] = clean_text(article.get("text", ""))
+        return article
+    except Exception as e:
+        return {"url": url, "error": f"extract failed: {e}"}
+
+
+def _extract_batch(items: List[Tuple[str, bytes]]) -> List[dict]:
+    # one task per chunk of pages to amortize IPC overhead
+    return [_extract_worker(item) for item in items]
+
+
+class ExtractionPool:
+    """
+    Process pool for the CPU-bound half of the pipeline (bs4 parsing and
+    clean_text). Network I/O stays in threads (see crawl); only raw HTML
+    bytes cross the process boundary.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, chunksize: int = 4, profiles_path: Optional[str] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunksize = max(1, chunksize)
+        # profiles_path: CacheDB file holding per-domain extraction profiles.
+        # Set up its schema once here, not concurrently in every worker.
+        if profiles_path:
+            from src.cache_db import CacheDB
+            db = CacheDB(profiles_path)
+            if db.path == ":memory:":
+                raise RuntimeError(f"Could not open profiles DB at {profiles_path}")
+            profiles_path = db.path
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                         initializer=_init_worker, initargs=(profiles_path,))
+
+    def extract_many(self, items: Iterable[Tuple[str, bytes]], max_pending: Optional[int] = None) -> Iterator[dict]:
+        """
+        items: iterable of (url, raw_html_bytes). Yields article dicts in input order.
+        Tasks are submitted in chunks of `chunksize`, and `items` is consumed
+        lazily: at most `max_pending` chunks (default 2 per worker) are in
+        flight, so parsing overlaps with whatever produces `items` and memory
+        stays bounded. (Executor.map would drain `items` up front.)
+        """
+        max_pending = max_pending or 2 * self.max_workers
+        pending = deque()
+        it = iter(items)
+        while True:
+            batch = list(islice(it, self.chunksize))
+            if not batch:
+                break
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+            pending.append(self._pool.submit(_extract_batch, batch))
+        while pending:
+            yield from pending.popleft().result()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _download(session, url, timeout):
+    try:
+        return url, fetch_html(url, timeout=timeout, session=session)
+    except Exception as e:
+        return url, e
+
+
+def crawl(urls: Iterable[str], fetch_workers: int = 8, extract_workers: Optional[int] = None,
+          chunksize: int = 4, timeout: int = 10, profiles_path: Optional[str] = None) -> Iterator[dict]:
+    """
+    Fetch urls with a thread pool and parse them in a process pool.
+    Yields article dicts (with a "cleaned" key), or {url, error} on failure,
+    in download-completion order. At most 2 * fetch_workers downloads are
+    in flight and parsing starts as soon as a chunk of pages has arrived.
+    """
+    session = _build_session()
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetchers, \
+            ExtractionPool(extract_workers, chunksize=chunksize, profiles_path=profiles_path) as pool:
+        url_iter = iter(urls)
+        failed = []
+
+        def submit(url):
+            return fetchers.submit(_download, session, url, timeout)
+
+        def fetched():
+            inflight = {submit(u) for u in islice(url_iter, 2 * fetch_workers)}
+            while inflight:
+                done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    for u in islice(url_iter, 1):
+                        inflight.add(submit(u))
+                    url, raw = fut.result()
+                    if isinstance(raw, Exception):
+                        failed.append({"url": url, "error": f"fetch failed: {raw}"})
+                    else:
+                        yield url, raw
+
+        for article in pool.extract_many(fetched()):
+            yield article
+            while failed:
+                yield failed.pop(0)
+        yield from failed
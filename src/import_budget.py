@@ -0,0 +1,85 @@
+# src/import_budget.py
+"""
+Import-time budget check for the app's own modules.
+
+Run with:  python -m src.import_budget [budget_ms]
+
+Imports the src modules that app.py imports at top level (plus
+src.llm_client, which it imports lazily) in a fresh interpreter, reports
+the wall time and fails if it exceeds the budget or if any of the heavy
+dependencies (Gemini SDK, bs4, requests, tqdm) were pulled in eagerly.
+"""
+import ast
+import os
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = 100
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# imported on first use rather than at the top of app.py, but its own
+# module-level imports must stay light too
+EXTRA_MODULES = ["src.llm_client"]
+
+HEAVY = ["google.genai", "bs4", "requests", "tqdm"]
+
+_PROBE = """
+import sys, time
+t0 = time.perf_counter()
+for m in {modules!r}:
+    __import__(m)
+elapsed = (time.perf_counter() - t0) * 1000
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(f"{{elapsed:.1f}}")
+print(",".join(loaded))
+"""
+
+
+def app_modules(path: str = APP_PATH):
+    """The src.* modules imported at the top level of app.py, in order."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    found = []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names = [node.module]
+        elif isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        else:
+            continue
+        found += [n for n in names if n.startswith("src.") and n not in found]
+    return found
+
+
+def measure(modules=None):
+    """Returns (elapsed_ms, eagerly_loaded_heavy_modules)."""
+    if modules is None:
+        modules = app_modules()
+        modules += [m for m in EXTRA_MODULES if m not in modules]
+    code = _PROBE.format(modules=modules, heavy=HEAVY)
+    # run from the repo root so "src" resolves however this script was started
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(APP_PATH))
+    lines = out.stdout.splitlines()
+    elapsed, loaded = lines[0], lines[1] if len(lines) > 1 else ""
+    return float(elapsed), [m for m in loaded.split(",") if m]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    budget = float(argv[0]) if argv else DEFAULT_BUDGET_MS
+    elapsed, loaded = measure()
+    print(f"import time: {elapsed:.1f} ms (budget {budget:.0f} ms)")
+    ok = True
+    if loaded:
+        print(f"heavy modules loaded at import: {', '.join(loaded)}")
+        ok = False
+    if elapsed > budget:
+        print("import budget exceeded")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,12 +2,86 @@
 import os
 import time
 import json
-from tqdm import tqdm
+import threading
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from functools import partial
 
-from google import genai
+from src.deadline import DeadlineExceeded, LatencyTracker
+
+# google.genai and tqdm are imported lazily: they are slow to load and are
+# not needed when a summary is served from the cache.
 
 KEY_ENV_VARS = ["GEMINI_API_KEY", "GOOGLE_API_KEY", "GENAI_API_KEY"]
 
+# HTTP timeout given to the SDK client, so a hung request eventually frees
+# its thread even after the caller has stopped waiting for it
+CLIENT_TIMEOUT_MS = 60_000
+# attempts still running after their deadline; past this, new attempts fail fast
+MAX_ABANDONED_CALLS = 16
+# time kept back for the aggregate call until its p95 is known, and the
+# largest share of a budget that may be kept back
+DEFAULT_AGGREGATE_RESERVE = 5.0
+MAX_RESERVE_FRACTION = 0.3
+
+# latencies per (kind, model): the "chunk" p95 is the hedge delay, the
+# "aggregate" p95 is the time kept back for the final call
+_latency_trackers = {}
+_latency_lock = threading.Lock()
+
+_abandoned = 0
+_abandoned_lock = threading.Lock()
+
+class GeminiOverloaded(RuntimeError):
+    """Too many Gemini calls are still running past their deadline; not retried."""
+
+def _latencies(kind, model):
+    with _latency_lock:
+        return _latency_trackers.setdefault((kind, model), LatencyTracker())
+
+def _spawn(fn):
+    """
+    Run fn on its own daemon thread and return a Future. No shared pool, so
+    a call never waits in a queue behind hung ones.
+    """
+    fut = Future()
+
+    def target():
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(fn())
+        except BaseException as e:
+            fut.set_exception(e)
+
+    threading.Thread(target=target, daemon=True, name="gemini-call").start()
+    return fut
+
+def _release_abandoned(_fut):
+    global _abandoned
+    with _abandoned_lock:
+        _abandoned -= 1
+
+def _run_with_timeout(fn, timeout):
+    """
+    Run one attempt on its own thread and wait up to `timeout`. The SDK call
+    cannot be cancelled, so an attempt still running at timeout is left to
+    finish (bounded by CLIENT_TIMEOUT_MS) and counted until it does.
+    """
+    global _abandoned
+    with _abandoned_lock:
+        if _abandoned >= MAX_ABANDONED_CALLS:
+            raise GeminiOverloaded(f"{_abandoned} Gemini calls are still running past their deadline")
+    fut = _spawn(fn)
+    try:
+        return fut.result(timeout=timeout)
+    except FutureTimeout:
+        with _abandoned_lock:
+            _abandoned += 1
+        # runs immediately if the call finished in the meantime
+        fut.add_done_callback(_release_abandoned)
+        raise DeadlineExceeded("deadline exceeded waiting for Gemini")
+
 def _get_api_key():
     for name in KEY_ENV_VARS:
         val = os.getenv(name)
@@ -22,9 +96,16 @@ def _init_client():
             "Missing Google Generative AI API key. Set one of the environment variables: "
             f"{', '.join(KEY_ENV_VARS)}. Example (PowerShell): setx GEMINI_API_KEY \"ya29.YOUR_KEY\""
         )
+    from google import genai
+
     try:
         # Create the genai client by explicitly passing the key
-        client = genai.Client(api_key=api_key)
+        try:
+            from google.genai import types
+            client = genai.Client(api_key=api_key, http_options=types.HttpOptions(timeout=CLIENT_TIMEOUT_MS))
+        except (ImportError, AttributeError, TypeError, ValueError):
+            # older SDKs without HttpOptions/timeout
+            client = genai.Client(api_key=api_key)
     except Exception as e:
         raise RuntimeError(f"Failed to initialize genai.Client with the provided key ({which}). Error: {e}")
     return client
@@ -68,51 +149,147 @@ def _extract_text_from_response(resp):
     # Fallback
     return str(resp)
 
-def _call_gemini(prompt, model="gemini-2.5-flash", max_output_tokens=256, retries=3, backoff=1.0):
-    client = _init_client()
+def _generate_once(client, prompt, model, max_output_tokens):
+    # Try the newer "responses" API if available
+    if hasattr(client, "responses") and callable(getattr(client, "responses").create):
+        # Many SDK versions use: client.responses.create(model=model, input=prompt, max_output_tokens=...)
+        try:
+            resp = client.responses.create(model=model, input=prompt, max_output_tokens=max_output_tokens)
+        except TypeError:
+            # maybe method signature doesn't accept max_output_tokens — call without it
+            resp = client.responses.create(model=model, input=prompt)
+        text = _extract_text_from_response(resp)
+        return text
+    # Fallback: older models.generate_content interface
+    elif hasattr(client, "models") and hasattr(client.models, "generate_content"):
+        # some SDK versions accept 'contents' (list/str). Avoid passing unsupported kwargs.
+        try:
+            resp = client.models.generate_content(model=model, contents=prompt)
+        except TypeError:
+            # last-ditch: try without 'contents' as keyword
+            resp = client.models.generate_content(model, prompt)
+        text = _extract_text_from_response(resp)
+        return text
+    # Final fallback: try client.generate_text (very old/alternate APIs)
+    elif hasattr(client, "generate_text"):
+        resp = client.generate_text(model=model, prompt=prompt, max_output_tokens=max_output_tokens)
+        return _extract_text_from_response(resp)
+    else:
+        raise RuntimeError("genai client does not expose a supported generation method on this SDK version.")
+
+def _call_gemini(prompt, model="gemini-2.5-flash", max_output_tokens=256, retries=3, backoff=1.0, client=None,
+                 deadline=None):
+    """
+    With a Deadline, each attempt runs on its own thread and is abandoned
+    once the remaining time runs out; backoff sleeps that would overrun it
+    raise DeadlineExceeded.
+    """
+    if client is None:
+        client = _init_client()
     last_err = None
     for attempt in range(retries):
         try:
-            # Try the newer "responses" API if available
-            if hasattr(client, "responses") and callable(getattr(client, "responses").create):
-                # Many SDK versions use: client.responses.create(model=model, input=prompt, max_output_tokens=...)
-                try:
-                    resp = client.responses.create(model=model, input=prompt, max_output_tokens=max_output_tokens)
-                except TypeError:
-                    # maybe method signature doesn't accept max_output_tokens — call without it
-                    resp = client.responses.create(model=model, input=prompt)
-                text = _extract_text_from_response(resp)
-                return text
-            # Fallback: older models.generate_content interface
-            elif hasattr(client, "models") and hasattr(client.models, "generate_content"):
-                # some SDK versions accept 'contents' (list/str). Avoid passing unsupported kwargs.
-                try:
-                    resp = client.models.generate_content(model=model, contents=prompt)
-                except TypeError:
-                    # last-ditch: try without 'contents' as keyword
-                    resp = client.models.generate_content(model, prompt)
-                text = _extract_text_from_response(resp)
-                return text
-            # Final fallback: try client.generate_text (very old/alternate APIs)
-            elif hasattr(client, "generate_text"):
-                resp = client.generate_text(model=model, prompt=prompt, max_output_tokens=max_output_tokens)
-                return _extract_text_from_response(resp)
-            else:
-                raise RuntimeError("genai client does not expose a supported generation method on this SDK version.")
+            if deadline is None:
+                return _generate_once(client, prompt, model, max_output_tokens)
+            # the SDK call has no per-request timeout we can rely on across
+            # versions, so bound it by waiting on it from its own thread
+            return _run_with_timeout(partial(_generate_once, client, prompt, model, max_output_tokens),
+                                     deadline.timeout())
+        except (DeadlineExceeded, GeminiOverloaded):
+            # retrying would only wait behind the same hung calls
+            raise
         except Exception as e:
             last_err = e
             if attempt < retries - 1:
-                time.sleep(backoff * (2 ** attempt))
+                delay = backoff * (2 ** attempt)
+                if deadline is None:
+                    time.sleep(delay)
+                else:
+                    deadline.sleep(delay)
             else:
                 raise RuntimeError(f"Gemini generate call failed after {retries} attempts. Last error: {e}")
     # should not reach here
     raise RuntimeError(f"Gemini generate call failed; last error: {last_err}")
 
+def _call_gemini_hedged(prompt, hedge_after=None, deadline=None, tracker=None, **kwargs):
+    """
+    Run _call_gemini; if it has not returned after `hedge_after` seconds,
+    fire one duplicate call and take whichever finishes first.
+    The primary call's own latency goes to `tracker`, even when the hedge
+    wins, so the p95 (and with it the hedge delay) is not biased downward.
+    """
+    started = time.monotonic()
+
+    def record():
+        if tracker is not None:
+            tracker.record(time.monotonic() - started)
+
+    if hedge_after is None:
+        try:
+            result = _call_gemini(prompt, deadline=deadline, **kwargs)
+        except DeadlineExceeded:
+            # a deadline hit still tells us the call took at least this long
+            record()
+            raise
+        record()
+        return result
+    primary = _spawn(partial(_call_gemini, prompt, deadline=deadline, **kwargs))
+    primary.add_done_callback(
+        lambda f: record() if f.exception() is None or isinstance(f.exception(), DeadlineExceeded) else None)
+    first_wait = hedge_after if deadline is None else deadline.timeout(hedge_after)
+    done, _ = wait([primary], timeout=first_wait)
+    if done:
+        return primary.result()
+    hedge = _spawn(partial(_call_gemini, prompt, deadline=deadline, **kwargs))
+    pending = {primary, hedge}
+    last_err = None
+    while pending:
+        timeout = None if deadline is None else deadline.timeout()
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded("deadline exceeded waiting for Gemini")
+        for fut in done:
+            if fut.exception() is None:
+                return fut.result()
+            last_err = fut.exception()
+    raise last_err
+
+def _partial_summary(chunk_summaries, total_chunks):
+    """Built locally from whatever chunk summaries finished before the deadline."""
+    summary_dict = {
+        "summary": " ".join(chunk_summaries),
+        "partial": True,
+        "chunks_summarized": len(chunk_summaries),
+        "chunks_total": total_chunks,
+    }
+    return summary_dict, {"topic": "", "sentiment": ""}
+
 # inside src/llm_client.py (replace the previous summarize_article_with_gemini)
-def summarize_article_with_gemini(chunks, model="gemini-2.5-flash"):
+def summarize_article_with_gemini(chunks, model="gemini-2.5-flash", client=None, deadline=None, hedge=False):
+    """
+    Map-reduce summary of the chunks. With a Deadline, chunk calls stop
+    early enough to leave time for the aggregate call (its recent p95), and
+    the aggregate runs over the chunk summaries done so far; such results
+    are flagged partial=True. If even the aggregate can't finish, a partial
+    summary is built locally from the chunk summaries. hedge=True fires a
+    duplicate call for chunks that run past the recent p95 latency.
+    """
     if not isinstance(chunks, (list, tuple)) or len(chunks) == 0:
         return {"summary": ""}, {"topic": "", "sentiment": ""}
 
+    from tqdm import tqdm
+
+    # one client for the whole map-reduce instead of one per call
+    if client is None:
+        client = _init_client()
+
+    chunk_latency = _latencies("chunk", model)
+    aggregate_latency = _latencies("aggregate", model)
+    chunk_deadline = deadline
+    if deadline is not None:
+        reserve = aggregate_latency.percentile(0.95) or DEFAULT_AGGREGATE_RESERVE
+        chunk_deadline = deadline.shortened(min(reserve, deadline.budget * MAX_RESERVE_FRACTION))
+
     chunk_summaries = []
     for c in tqdm(chunks, desc="Summarizing chunks", leave=False):
         prompt = (
@@ -121,9 +298,18 @@ def summarize_article_with_gemini(chunks, model="gemini-2.5-flash"):
             f"CHUNK:\n\"\"\"\n{c}\n\"\"\"\n\n"
             "Return ONLY the summary sentence(s)."
         )
-        s = _call_gemini(prompt, model=model, max_output_tokens=180)
+        hedge_after = chunk_latency.percentile(0.95) if hedge else None
+        try:
+            s = _call_gemini_hedged(prompt, hedge_after=hedge_after, deadline=chunk_deadline, tracker=chunk_latency,
+                                    model=model, max_output_tokens=180, client=client)
+        except DeadlineExceeded:
+            # out of chunk time: aggregate what we have with the time kept back
+            break
         chunk_summaries.append(s.strip())
 
+    if not chunk_summaries:
+        return _partial_summary(chunk_summaries, len(chunks))
+
     aggregate_prompt = (
         "You are an expert news summarizer and classifier.\n\n"
         "Given the following chunk-level summaries, produce:\n"
@@ -134,7 +320,12 @@ def summarize_article_with_gemini(chunks, model="gemini-2.5-flash"):
         "Output JSON ONLY in the form:\n"
         '{"summary":"...","topic":"...", "sentiment":"..."}'
     )
-    agg = _call_gemini(aggregate_prompt, model=model, max_output_tokens=250)
+    started = time.monotonic()
+    try:
+        agg = _call_gemini(aggregate_prompt, model=model, max_output_tokens=250, client=client, deadline=deadline)
+    except DeadlineExceeded:
+        return _partial_summary(chunk_summaries, len(chunks))
+    aggregate_latency.record(time.monotonic() - started)
 
     out = {"summary": agg.strip(), "topic": "", "sentiment": ""}
     try:
@@ -151,6 +342,8 @@ def summarize_article_with_gemini(chunks, model="gemini-2.5-flash"):
         out = {"summary": agg.strip(), "topic": "", "sentiment": ""}
 
     summary_dict = {"summary": out.get("summary", "")}
+    if len(chunk_summaries) < len(chunks):
+        summary_dict.update(partial=True, chunks_summarized=len(chunk_summaries), chunks_total=len(chunks))
     meta_dict = {"topic": out.get("topic", ""), "sentiment": out.get("sentiment", "")}
     return summary_dict, meta_dict
 
@@ -0,0 +1,127 @@
+# src/near_dup.py
+import hashlib
+import re
+import sqlite3
+from typing import Optional, Tuple
+
+HASH_BITS = 64
+BANDS = 4
+BAND_BITS = HASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# below this many shingles a fingerprint is too coarse to call two texts
+# duplicates ("Breaking news" would match any page containing it)
+MIN_SHINGLES = 20
+# candidates whose shingle counts differ by more than this ratio are not duplicates
+MIN_LENGTH_RATIO = 0.5
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _shingles(text: str, size: int = 3):
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word 3-gram shingles of the cleaned text."""
+    return _simhash_shingles(_shingles(text))
+
+
+def _simhash_shingles(shingles) -> int:
+    if not shingles:
+        return 0
+    # one fixed-width bit string per shingle; zip(*) transposes them into
+    # per-bit columns so the majority vote runs in C rather than a bit loop
+    rows = [format(int.from_bytes(hashlib.blake2b(sh.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+            for sh in shingles]
+    half = len(rows) / 2
+    bits = "".join("1" if col.count("1") > half else "0" for col in map("".join, zip(*rows)))
+    return int(bits, 2)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(h: int):
+    return [(h >> (i * BAND_BITS)) & BAND_MASK for i in range(BANDS)]
+
+
+def _to_signed(h: int) -> int:
+    # SQLite INTEGER is signed 64-bit
+    return h - (1 << HASH_BITS) if h >= 1 << (HASH_BITS - 1) else h
+
+
+def _to_unsigned(h: int) -> int:
+    return h + (1 << HASH_BITS) if h < 0 else h
+
+
+class NearDupIndex:
+    """
+    Near-duplicate lookup over cleaned article text, stored in the CacheDB file.
+
+    Fingerprints are split into four 16-bit bands; by the pigeonhole
+    principle any two hashes within Hamming distance 3 share at least one
+    band, so a lookup is four indexed equality probes plus an exact
+    distance check on the few candidates.
+    """
+
+    def __init__(self, cache, max_distance: int = 3):
+        if max_distance >= BANDS:
+            raise ValueError(f"max_distance must be < {BANDS} for banded lookup")
+        self.path = cache.path
+        self.max_distance = max_distance
+
+    def add(self, url: str, text: str) -> Optional[int]:
+        """Index `text` under `url`. Texts shorter than MIN_SHINGLES are skipped (returns None)."""
+        shingles = _shingles(text)
+        if len(shingles) < MIN_SHINGLES:
+            return None
+        h = _simhash_shingles(shingles)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        c = conn.cursor()
+        c.execute("""
+        INSERT OR REPLACE INTO simhashes (url, hash, b0, b1, b2, b3, shingles)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (url, _to_signed(h), *_bands(h), len(shingles)))
+        conn.commit()
+        conn.close()
+        return h
+
+    def find(self, text: str, exclude_url: Optional[str] = None) -> Optional[Tuple[str, int]]:
+        """
+        Returns (url, hamming_distance) of the closest indexed article within
+        max_distance and of comparable length, or None. Texts shorter than
+        MIN_SHINGLES never match.
+        """
+        shingles = _shingles(text)
+        if len(shingles) < MIN_SHINGLES:
+            return None
+        return self.find_hash(_simhash_shingles(shingles), exclude_url=exclude_url, n_shingles=len(shingles))
+
+    def find_hash(self, h: int, exclude_url: Optional[str] = None,
+                  n_shingles: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        b = _bands(h)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        c = conn.cursor()
+        c.execute("""
+        SELECT url, hash, shingles FROM simhashes
+        WHERE b0 = ? OR b1 = ? OR b2 = ? OR b3 = ?
+        """, b)
+        rows = c.fetchall()
+        conn.close()
+        best = None
+        for url, other, other_n in rows:
+            if url == exclude_url:
+                continue
+            if n_shingles is not None:
+                # rows indexed before lengths were stored can't be compared
+                if not other_n or min(n_shingles, other_n) / max(n_shingles, other_n) < MIN_LENGTH_RATIO:
+                    continue
+            d = hamming(h, _to_unsigned(other))
+            if d <= self.max_distance and (best is None or d < best[1]):
+                best = (url, d)
+        return best
@@ -0,0 +1,233 @@
+# src/profiles.py
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+# candidates tried in order when learning where a site keeps its title/date;
+# the selector that matches is stored in the profile
+TITLE_CANDIDATES = ['meta[property="og:title"]', 'meta[name="og:title"]', "h1", "title"]
+DATE_CANDIDATES = [
+    'meta[property="article:published_time"]', 'meta[name="article:published_time"]',
+    'meta[name="pubdate"]', 'meta[name="publishdate"]',
+    'meta[property="og:article:published_time"]', 'meta[name="date"]',
+    "time[datetime]",
+]
+
+# containers that are never article bodies
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "form"}
+
+_GENERATED_RE = re.compile(r"\d{3,}|^css-|^sc-|__[a-z0-9]{5,}$", re.I)
+
+
+def domain_of(url: str) -> str:
+    netloc = urlparse(url).netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def densest_block(soup, min_len: int = 40):
+    """
+    The element holding the most paragraph text: each <p> longer than
+    min_len credits its parent, skipping anything inside nav/header/footer.
+    """
+    scores = {}
+    for p in soup.find_all("p"):
+        parent = p.parent
+        if parent is None or any(a.name in BOILERPLATE_TAGS for a in p.parents):
+            continue
+        n = len(p.get_text(" ", strip=True))
+        if n <= min_len:
+            continue
+        key = id(parent)
+        el, score = scores.get(key, (parent, 0))
+        scores[key] = (el, score + n)
+    if not scores:
+        return None
+    return max(scores.values(), key=lambda t: t[1])[0]
+
+
+def selector_for(el, depth: int = 3) -> Optional[str]:
+    """
+    A stable CSS selector for el: tag#id, else tag.class..., else anchored
+    on the nearest ancestor with an id or class. Generated-looking
+    ids/classes (hashes, counters) are ignored since they change between
+    pages. Returns None when there is no such anchor: a purely structural
+    selector like "body > div > div" would select_one the first match on
+    the page, not the dense block.
+    """
+    import soupsieve as sv
+
+    if el is None or el.name in (None, "[document]", "body", "html"):
+        return None
+    el_id = el.get("id")
+    if el_id and not _GENERATED_RE.search(el_id):
+        return f"{el.name}#{sv.escape(el_id)}"
+    classes = [c for c in el.get("class", []) if not _GENERATED_RE.search(c)]
+    if classes:
+        return el.name + "".join("." + sv.escape(c) for c in classes)
+    if depth <= 0:
+        return None
+    parent = selector_for(el.parent, depth - 1)
+    return f"{parent} > {el.name}" if parent else None
+
+
+def _first_match(soup, candidates):
+    for sel in candidates:
+        if soup.select_one(sel) is not None:
+            return sel
+    return None
+
+
+def select_value(el):
+    """Text of a title/date element: meta content, time datetime, else text."""
+    if el is None:
+        return None
+    if el.name == "meta":
+        return el.get("content")
+    if el.name == "time":
+        return el.get("datetime") or el.get_text(strip=True)
+    return el.get_text(" ", strip=True)
+
+
+class Profile:
+    """Learned selectors for one domain, compiled once with soupsieve."""
+
+    def __init__(self, domain, body=None, title=None, date=None):
+        import soupsieve as sv
+
+        self.domain = domain
+        self.body = body
+        self.title = title
+        self.date = date
+        self._body = sv.compile(body) if body else None
+        self._title = sv.compile(title) if title else None
+        self._date = sv.compile(date) if date else None
+
+    def select_body(self, soup):
+        return self._body.select_one(soup) if self._body else None
+
+    def select_title(self, soup):
+        return select_value(self._title.select_one(soup)) if self._title else None
+
+    def select_date(self, soup):
+        return select_value(self._date.select_one(soup)) if self._date else None
+
+
+class ProfileRegistry:
+    """
+    Per-domain extraction profiles, stored in the CacheDB file.
+
+    Only the first `learn_pages` pages of a domain are observed: each votes
+    for the selector of its densest text block (and for which title/date
+    candidates exist). If one body selector has a majority the profile is
+    compiled and used by extract_article for later pages of that domain;
+    otherwise the domain is settled without a profile and uses the generic
+    heuristics from then on.
+    """
+
+    def __init__(self, cache, learn_pages: int = 3):
+        self.path = cache.path if cache is not None else None
+        self.learn_pages = learn_pages
+        self._lock = threading.Lock()
+        # domain -> Profile, or None once learning finished without one
+        self._settled = {}
+
+    @classmethod
+    def for_path(cls, path: str, learn_pages: int = 3) -> "ProfileRegistry":
+        """
+        Registry on a cache file whose schema is already set up (e.g. by a
+        CacheDB in a parent process). Raises if the profiles table is missing.
+        """
+        conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            found = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'extraction_profiles'").fetchone()
+        finally:
+            conn.close()
+        if not found:
+            raise RuntimeError(f"{path} has no extraction_profiles table; open it with CacheDB first")
+        registry = cls(None, learn_pages)
+        registry.path = path
+        return registry
+
+    def get(self, url: str) -> Optional[Profile]:
+        domain = domain_of(url)
+        with self._lock:
+            if domain in self._settled:
+                return self._settled[domain]
+        row = self._load(domain)
+        if not row:
+            return None
+        if not row["body"]:
+            if row["samples"] >= self.learn_pages:
+                self._settle(domain, None)
+            return None
+        try:
+            prof = Profile(domain, row["body"], row["title"], row["date"])
+        except Exception:
+            prof = None
+        self._settle(domain, prof)
+        return prof
+
+    def _settle(self, domain, prof):
+        with self._lock:
+            self._settled[domain] = prof
+
+    def observe(self, url: str, soup) -> Optional[Profile]:
+        """
+        Record one page of a domain that is still being learned. Returns the
+        Profile once learned. A no-op once the domain is settled.
+        """
+        domain = domain_of(url)
+        with self._lock:
+            if domain in self._settled:
+                return self._settled[domain]
+        body_sel = selector_for(densest_block(soup))
+        title_sel = _first_match(soup, TITLE_CANDIDATES)
+        date_sel = _first_match(soup, DATE_CANDIDATES)
+
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            c.execute("SELECT body, samples, votes FROM extraction_profiles WHERE domain = ?", (domain,))
+            r = c.fetchone()
+            if r and (r[0] or r[1] >= self.learn_pages):
+                # learned, or learning already finished in another process
+                conn.commit()
+                return self.get(url)
+            samples = (r[1] if r else 0) + 1
+            votes = json.loads(r[2]) if r and r[2] else {"body": {}, "title": {}, "date": {}}
+            for field, sel in (("body", body_sel), ("title", title_sel), ("date", date_sel)):
+                if sel:
+                    votes[field][sel] = votes[field].get(sel, 0) + 1
+
+            learned = {}
+            if samples >= self.learn_pages:
+                for field in ("body", "title", "date"):
+                    if votes[field]:
+                        sel, n = max(votes[field].items(), key=lambda kv: kv[1])
+                        if n * 2 > samples:
+                            learned[field] = sel
+            c.execute("""
+            INSERT OR REPLACE INTO extraction_profiles (domain, body, title, date, samples, votes, ts)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (domain, learned.get("body"), learned.get("title"), learned.get("date"),
+                  samples, json.dumps(votes), int(time.time())))
+            conn.commit()
+        finally:
+            conn.close()
+        return self.get(url) if samples >= self.learn_pages else None
+
+    def _load(self, domain):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        c = conn.cursor()
+        c.execute("SELECT body, title, date, samples FROM extraction_profiles WHERE domain = ?", (domain,))
+        r = c.fetchone()
+        conn.close()
+        if not r:
+            return None
+        return {"body": r[0], "title": r[1], "date": r[2], "samples": r[3] or 0}
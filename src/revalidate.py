@@ -0,0 +1,54 @@
+# src/revalidate.py
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from src.singleflight import SingleFlight
+
+
+class Revalidator:
+    """
+    Background refresh pool for stale-while-revalidate serving.
+
+    The caller serves the stale cached summary right away and hands the
+    refresh (fetch + summarize + cache.save) to `schedule`. A key already
+    queued here is not queued again, and refreshes run through the
+    SingleFlight, so they coalesce with other refreshes of the same key,
+    in this process and (via the lease) in others. They do not coalesce
+    with foreground runs: the app keys refreshes by URL alone, since the
+    content is not known until the page is fetched, while foreground runs
+    are keyed by URL + content hash. The two rarely overlap, since a
+    foreground run only happens on a cache miss.
+    """
+
+    def __init__(self, flight: Optional[SingleFlight] = None, max_workers: int = 2):
+        self.flight = flight or SingleFlight()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="revalidate")
+        self._lock = threading.Lock()
+        self._pending = set()
+
+    def schedule(self, key: str, fn: Callable[[], Any], lookup: Optional[Callable[[], Any]] = None) -> bool:
+        """
+        Queue a refresh for `key`. Returns False if one is already queued or running.
+        """
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        self._pool.submit(self._run, key, fn, lookup)
+        return True
+
+    def _run(self, key, fn, lookup):
+        try:
+            self.flight.do(key, fn, lookup=lookup)
+        except Exception as e:
+            # the stale row stays in place; the next request will try again
+            warnings.warn(f"Background refresh for {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
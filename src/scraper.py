@@ -1,14 +1,15 @@
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 import re
 from datetime import datetime
 
 # near imports in src/scraper.py
 from urllib.parse import urljoin
-import urllib.robotparser
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from src.profiles import densest_block
+
+# requests, bs4 and urllib.robotparser (which pulls in urllib.request) are
+# imported inside the functions that use them so that importing this module
+# (e.g. on a Streamlit rerun) stays cheap.
 
 
 
@@ -17,6 +18,8 @@ HEADERS = {
 }
 
 def is_allowed_by_robots(url, user_agent=HEADERS["User-Agent"], timeout=5):
+    import urllib.robotparser
+
     parsed = urlparse(url)
     robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
     rp = urllib.robotparser.RobotFileParser()
@@ -29,6 +32,10 @@ def is_allowed_by_robots(url, user_agent=HEADERS["User-Agent"], timeout=5):
         return True
 
 def _build_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
     s = requests.Session()
     retries = Retry(total=3, backoff_factor=0.5,
                     status_forcelist=[429, 500, 502, 503, 504],
@@ -38,29 +45,61 @@ def _build_session():
     s.headers.update(HEADERS)
     return s
 
-def fetch_article(url, timeout=10):
+def fetch_article(url, timeout=10, profiles=None, deadline=None):
     """
     Returns: dict {title, date, author, url, text}
     Very small heuristic-based extractor for demo use.
+    profiles: optional ProfileRegistry (src/profiles.py) for per-domain selectors.
+    deadline: optional Deadline (src/deadline.py); the request timeout is
+    capped by the time it has left.
     """
+    import requests
+
+    if deadline is not None:
+        timeout = deadline.timeout(timeout)
     resp = requests.get(url, headers=HEADERS, timeout=timeout)
     resp.raise_for_status()
-    html = resp.text
-    soup = BeautifulSoup(html, "html.parser")
+    return extract_article(resp.text, url, profiles=profiles)
 
-    # Title
-    title = (soup.find("meta", property="og:title") or
-             soup.find("meta", attrs={"name":"og:title"}) or
-             soup.find("title"))
-    title_text = title.get("content") if title and title.has_attr("content") else (title.text.strip() if title else "")
+def fetch_html(url, timeout=10, session=None, deadline=None):
+    """
+    Network half of fetch_article: returns the raw response body as bytes,
+    leaving parsing to extract_article (e.g. in a process pool).
+    """
+    import requests
 
-    # Date: try common meta tags
-    date = None
-    for tag in ["article:published_time", "pubdate", "publishdate", "og:article:published_time", "date"]:
-        meta = soup.find("meta", property=tag) or soup.find("meta", attrs={"name": tag})
-        if meta and meta.has_attr("content"):
-            date = meta["content"]
-            break
+    if deadline is not None:
+        timeout = deadline.timeout(timeout)
+    getter = session.get if session is not None else requests.get
+    resp = getter(url, headers=HEADERS, timeout=timeout)
+    resp.raise_for_status()
+    return resp.content
+
+def extract_article(html, url, profiles=None):
+    """
+    Parsing half of fetch_article: html may be str or raw bytes.
+    Returns: dict {title, date, author, url, text}
+    Pure CPU work, no network — safe to run in a worker process.
+    With a ProfileRegistry, a learned domain profile's selectors are used
+    first; pages of unlearned domains are fed back to the registry.
+    """
+    from bs4 import BeautifulSoup
+
+    if isinstance(html, bytes):
+        # let bs4 sniff the encoding from the bytes / meta charset
+        soup = BeautifulSoup(html, "html.parser")
+        html = html.decode(soup.original_encoding or "utf-8", errors="replace")
+    else:
+        soup = BeautifulSoup(html, "html.parser")
+
+    profile = profiles.get(url) if profiles is not None else None
+    if profile is not None:
+        article = _extract_with_profile(soup, url, profile)
+        if article is not None:
+            return article
+
+    title_text = _generic_title(soup)
+    date = _generic_date(soup)
 
     # Main article text heuristics
     article_tag = soup.find("article")
@@ -77,10 +116,20 @@ def fetch_article(url, timeout=10):
     # join paragraphs and filter short bits
     text = "\n\n".join([p for p in paragraphs if len(p) > 40])
 
+    # next fallback: the densest paragraph block (avoids nav/footer junk);
+    # every <p> was short to get here, so don't apply the length filter
+    if not text:
+        block = densest_block(soup, min_len=0)
+        if block is not None:
+            text = "\n\n".join(p.get_text(separator=" ", strip=True) for p in block.find_all("p"))
+
     # final fallback using regex to strip tags
     if not text:
         text = re.sub(r"<[^>]+>", "", html)
 
+    if profiles is not None and profile is None:
+        profiles.observe(url, soup)
+
     return {
         "title": title_text,
         "date": date or datetime.utcnow().isoformat(),
@@ -88,3 +137,40 @@ def fetch_article(url, timeout=10):
         "url": url,
         "text": text
     }
+
+def _generic_title(soup):
+    title = (soup.find("meta", property="og:title") or
+             soup.find("meta", attrs={"name":"og:title"}) or
+             soup.find("title"))
+    return title.get("content") if title and title.has_attr("content") else (title.text.strip() if title else "")
+
+def _generic_date(soup):
+    # Date: try common meta tags
+    for tag in ["article:published_time", "pubdate", "publishdate", "og:article:published_time", "date"]:
+        meta = soup.find("meta", property=tag) or soup.find("meta", attrs={"name": tag})
+        if meta and meta.has_attr("content"):
+            return meta["content"]
+    return None
+
+def _extract_with_profile(soup, url, profile):
+    """
+    Extraction using a learned domain profile. Returns None when the body
+    selector no longer matches (site redesign) so the generic path runs.
+    """
+    block = profile.select_body(soup)
+    if block is None:
+        return None
+    # the container is known to be the article, so keep short paragraphs too
+    paragraphs = [p.get_text(separator=" ", strip=True) for p in block.find_all("p")]
+    text = "\n\n".join(p for p in paragraphs if p)
+    if not text:
+        return None
+    # per field, fall back to the generic lookup when the learned selector
+    # is missing or matches nothing on this page
+    return {
+        "title": profile.select_title(soup) or _generic_title(soup),
+        "date": profile.select_date(soup) or _generic_date(soup) or datetime.utcnow().isoformat(),
+        "author": None,
+        "url": url,
+        "text": text
+    }
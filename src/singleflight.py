@@ -0,0 +1,121 @@
+# src/singleflight.py
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalize a URL so trivially different spellings share one key:
+    lowercase scheme/host, drop fragment, tracking params and trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PARAMS)]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ""))
+
+
+def flight_key(url: str, text: Optional[str] = None) -> str:
+    """Key for a summarize request: canonical URL plus a hash of the content, if known."""
+    key = canonical_url(url)
+    if text:
+        key += "#" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+    return key
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one computation.
+
+    In-process callers wait on the leader's thread. If a CacheDB is given,
+    the leader also takes a lease row in SQLite so other worker processes
+    wait for the result to land in the cache instead of recomputing it.
+    The lease is renewed every lease_ttl/3 seconds while fn runs, so slow
+    computations are not taken over mid-flight.
+    """
+
+    def __init__(self, cache=None, lease_ttl: int = 300, poll_interval: float = 0.5):
+        self.cache = cache
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: str, fn: Callable[[], Any], lookup: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Run `fn()` once per key across concurrent callers and return its result.
+        `lookup()` should return the finished result from the shared cache (or
+        None); it is used to pick up work completed by another process, so
+        it must not return entries written before this call started (see
+        CacheDB.get's ts).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn, lookup)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def _run(self, key, fn, lookup):
+        if self.cache is None:
+            return fn()
+        while True:
+            if self.cache.acquire_lease(key, self.owner, self.lease_ttl):
+                stop = threading.Event()
+                beat = threading.Thread(target=self._heartbeat, args=(key, stop), daemon=True)
+                beat.start()
+                try:
+                    return fn()
+                finally:
+                    stop.set()
+                    beat.join()
+                    self.cache.release_lease(key, self.owner)
+            # another process is computing it: wait for the result or the lease to go away
+            while self.cache.lease_held(key):
+                time.sleep(self.poll_interval)
+                if lookup is not None:
+                    found = lookup()
+                    if found is not None:
+                        return found
+            if lookup is not None:
+                found = lookup()
+                if found is not None:
+                    return found
+            # lease released without a result (owner failed): try to take over
+
+    def _heartbeat(self, key, stop):
+        while not stop.wait(max(1.0, self.lease_ttl / 3)):
+            if not self.cache.renew_lease(key, self.owner, self.lease_ttl):
+                return